@@ -0,0 +1,71 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling for chart traces.
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def lttb(x_i8, y, n_out):
+    """
+    Return the indices of ``n_out`` points that preserve the visual shape
+    of the series ``(x_i8, y)``.
+
+    ``x_i8`` must be sorted (e.g. ``DatetimeIndex.asi8``). NaNs in ``y``
+    are ignored when averaging buckets and never win a bucket unless the
+    whole bucket is NaN.
+    """
+    n = y.shape[0]
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Offset timestamps before the float cast to keep precision.
+    x = (x_i8 - x_i8[0]).astype(np.float64)
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[n_out - 1] = n - 1
+
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        # Average of the next bucket
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = 0.0
+        avg_y = 0.0
+        cnt = 0
+        for j in range(avg_start, avg_end):
+            if not np.isnan(y[j]):
+                avg_x += x[j]
+                avg_y += y[j]
+                cnt += 1
+        if cnt > 0:
+            avg_x /= cnt
+            avg_y /= cnt
+        else:
+            avg_x = x[avg_start]
+            avg_y = y[a]
+
+        # Point in the current bucket forming the largest triangle
+        range_start = int(np.floor(i * every)) + 1
+        range_end = int(np.floor((i + 1) * every)) + 1
+        ax = x[a]
+        ay = y[a]
+        if np.isnan(ay):
+            ay = avg_y
+        max_area = -1.0
+        max_idx = range_start
+        for j in range(range_start, range_end):
+            if np.isnan(y[j]):
+                continue
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                max_idx = j
+
+        out[i + 1] = max_idx
+        a = max_idx
+
+    return out
@@ -0,0 +1,206 @@
+"""
+Numba-compiled kernels used by the analytics and backtest modules.
+
+Kernels operate on plain NumPy arrays only; callers are responsible for
+converting pandas objects on the way in and out.
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def bt_kernel(
+    sp, z, entry_z, exit_z, pnl, entry_idx, exit_idx, direction, entry_zs, exit_zs, pnl_trade
+):
+    """
+    Mean-reversion backtest loop over aligned spread / z-score arrays.
+
+    Writes into caller-provided arrays, each at least ``len(sp)`` long:
+
+    pnl : per-bar marked PnL (must be zero-initialised)
+    entry_idx, exit_idx : positional indices of trade entries / exits
+    direction : +1 long spread, -1 short spread
+    entry_zs, exit_zs : z-score at entry / exit
+    pnl_trade : PnL booked on the exit bar
+
+    Returns the number of completed trades.
+    """
+    n = sp.shape[0]
+    n_trades = 0
+    if n == 0:
+        return n_trades
+
+    in_position = False
+    cur_dir = 0
+    entry_i = 0
+    entry_z_val = 0.0
+    prev_spread = sp[0]
+
+    for t in range(1, n):
+        s = sp[t]
+        zval = z[t]
+
+        if not in_position:
+            if zval >= entry_z:
+                in_position = True
+                cur_dir = -1  # short spread: short A / long B
+                entry_i = t
+                entry_z_val = zval
+            elif zval <= -entry_z:
+                in_position = True
+                cur_dir = 1  # long spread: long A / short B
+                entry_i = t
+                entry_z_val = zval
+        elif (cur_dir == 1 and zval >= exit_z) or (cur_dir == -1 and zval <= exit_z):
+            entry_idx[n_trades] = entry_i
+            exit_idx[n_trades] = t
+            direction[n_trades] = cur_dir
+            entry_zs[n_trades] = entry_z_val
+            exit_zs[n_trades] = zval
+            pnl_trade[n_trades] = cur_dir * (s - prev_spread)
+            n_trades += 1
+            in_position = False
+            cur_dir = 0
+
+        # Mark PnL incrementally (very simplified)
+        if in_position:
+            pnl[t] = cur_dir * (s - prev_spread)
+
+        prev_spread = s
+
+    return n_trades
+
+
+@njit(cache=True)
+def rolling_mean_std(x, window, min_periods):
+    """
+    Rolling mean and sample std (ddof=1) in a single pass.
+
+    Uses Welford's online update with removal of the value leaving the
+    window. NaNs are skipped and do not count towards ``min_periods``,
+    matching ``pd.Series.rolling``. Accumulation is in float64; outputs
+    have the dtype of ``x``.
+    """
+    n = x.shape[0]
+    mean_out = np.full_like(x, np.nan)
+    std_out = np.full_like(x, np.nan)
+
+    nobs = 0
+    mean = 0.0
+    ssqdm = 0.0
+
+    for i in range(n):
+        v = x[i]
+        if not np.isnan(v):
+            nobs += 1
+            delta = v - mean
+            mean += delta / nobs
+            ssqdm += delta * (v - mean)
+
+        if i >= window:
+            old = x[i - window]
+            if not np.isnan(old):
+                nobs -= 1
+                if nobs > 0:
+                    delta = old - mean
+                    mean -= delta / nobs
+                    ssqdm -= delta * (old - mean)
+                else:
+                    mean = 0.0
+                    ssqdm = 0.0
+
+        if nobs >= min_periods and nobs > 0:
+            mean_out[i] = mean
+            if nobs > 1:
+                std_out[i] = np.sqrt(max(ssqdm, 0.0) / (nobs - 1))
+
+    return mean_out, std_out
+
+
+@njit(cache=True)
+def ohlcv(ts_ms, price, qty, bucket_ms):
+    """
+    OHLCV bars over fixed-width time buckets.
+
+    Emits one row per bucket from the first to the last tick, like
+    ``resample``: empty buckets get NaN prices and zero volume. Ticks are
+    taken in array order, so open/close follow arrival order.
+
+    Returns (bucket_start_ms, bars) where ``bars`` has shape (5, n_buckets)
+    with rows open, high, low, close, volume; ``bars.T`` can back a
+    single-block DataFrame without copying.
+    """
+    n = ts_ms.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty((5, 0), dtype=np.float64)
+
+    first = ts_ms[0] // bucket_ms
+    last = first
+    for i in range(1, n):
+        b = ts_ms[i] // bucket_ms
+        if b < first:
+            first = b
+        elif b > last:
+            last = b
+
+    m = last - first + 1
+    bars = np.full((5, m), np.nan)
+    o = bars[0]
+    h = bars[1]
+    lo = bars[2]
+    c = bars[3]
+    v = bars[4]
+    v[:] = 0.0
+
+    for i in range(n):
+        j = ts_ms[i] // bucket_ms - first
+        p = price[i]
+        if np.isnan(o[j]):
+            o[j] = p
+            h[j] = p
+            lo[j] = p
+        else:
+            if p > h[j]:
+                h[j] = p
+            if p < lo[j]:
+                lo[j] = p
+        c[j] = p
+        v[j] += qty[i]
+
+    bkt = (np.arange(m) + first) * bucket_ms
+    return bkt, bars
+
+
+@njit(cache=True)
+def head_bar(ts_ms, price, qty, start, count, bucket_ms):
+    """
+    OHLCV of the bucket holding the oldest tick of a ring buffer.
+
+    Walks forward from ring position ``start`` while ticks stay in that
+    bucket, so only the first bar's ticks are read. Assumes ticks are in
+    time order, as they are per symbol on the trade stream.
+
+    Returns (bucket, bar) with bar = [open, high, low, close, volume].
+    """
+    n = ts_ms.shape[0]
+    b0 = ts_ms[start] // bucket_ms
+    bar = np.empty(5)
+    bar[0] = price[start]
+    bar[1] = price[start]
+    bar[2] = price[start]
+    bar[4] = 0.0
+
+    for k in range(count):
+        i = (start + k) % n
+        if ts_ms[i] // bucket_ms != b0:
+            break
+        p = price[i]
+        if p > bar[1]:
+            bar[1] = p
+        if p < bar[2]:
+            bar[2] = p
+        bar[3] = p
+        bar[4] += qty[i]
+
+    return b0, bar
@@ -0,0 +1,89 @@
+"""
+Streaming quantile estimation.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate using the P² algorithm (Jain & Chlamtac, 1985).
+
+    Tracks five markers, so memory and per-update cost are O(1). The
+    estimate is exact for the first five observations and approximate
+    afterwards.
+    """
+
+    # Observations required before the estimate is used in place of an
+    # exact median.
+    min_count = 100
+
+    def __init__(self, p: float = 0.5):
+        self.p = p
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Drop all observations.
+        """
+        p = self.p
+        self.count = 0
+        self._q: List[float] = []  # marker heights
+        self._n = [0, 1, 2, 3, 4]  # marker positions
+        self._np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]  # desired positions
+        self._dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.min_count
+
+    @property
+    def value(self) -> float:
+        if self.count >= 5:
+            return self._q[2]
+        if not self._q:
+            return float("nan")
+        return float(np.quantile(self._q, self.p))
+
+    def update(self, x: float) -> None:
+        self.count += 1
+        q, n = self._q, self._n
+        if self.count <= 5:
+            q.append(x)
+            if self.count == 5:
+                q.sort()
+            return
+
+        # Find the cell containing x, extending the extremes if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+
+        # Nudge the three middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self._np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                qp = q[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    # Parabolic step would break ordering; fall back to linear
+                    qp = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = qp
+                n[i] += step
@@ -1,55 +1,126 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
 import numpy as np
 import pandas as pd
+from numpy.typing import DTypeLike
 
+from _kernels import rolling_mean_std
+from _quantile import P2Quantile
 
-def estimate_hedge_ratio_ratio(price_a: pd.Series, price_b: pd.Series) -> float:
+
+def estimate_hedge_ratio_ratio(
+    price_a: pd.Series, price_b: pd.Series, live: Optional[P2Quantile] = None
+) -> float:
     """
     Estimate hedge ratio using price ratio method:
     Computes the average ratio of price_a to price_b over the window.
     This is simpler and more intuitive than OLS for pair trading.
+
+    If ``live`` is a warmed-up running median from
+    ``InMemoryStore.watch_pair``, it is used instead of recomputing the
+    median. That estimator is the median of tick-by-tick price ratios over
+    the same ticks the store is buffering; it goes cold (and this falls
+    back to the exact median over the given prices) once either symbol's
+    ring buffer starts evicting ticks.
     """
-    aligned = pd.concat([price_a, price_b], axis=1).dropna()
-    if aligned.shape[0] < 10:
-        return 1.0
+    if live is not None and live.ready:
+        hedge_ratio = live.value
+    else:
+        if not price_a.index.equals(price_b.index):
+            price_a, price_b = price_a.align(price_b, join="inner")
 
-    # Compute ratio and use median to avoid outliers
-    ratio = aligned.iloc[:, 0] / aligned.iloc[:, 1]
-    hedge_ratio = float(ratio.median())
-    
-    # Ensure reasonable bounds
-    if hedge_ratio <= 0 or hedge_ratio > 1000:
-        hedge_ratio = 1.0
-    
+        a = price_a.to_numpy(dtype=np.float64, copy=False)
+        b = price_b.to_numpy(dtype=np.float64, copy=False)
+        mask = np.isfinite(a) & np.isfinite(b) & (b != 0)
+        if np.count_nonzero(mask) < 10:
+            return 1.0
+
+        # Median of the ratio (robust to outliers) via O(N) selection
+        ratio = a[mask] / b[mask]
+        k = ratio.size // 2
+        if ratio.size % 2:
+            hedge_ratio = float(np.partition(ratio, k)[k])
+        else:
+            part = np.partition(ratio, (k - 1, k))
+            hedge_ratio = float(0.5 * (part[k - 1] + part[k]))
+
+    # Ensure reasonable bounds (NaN included)
+    if not np.isfinite(hedge_ratio) or hedge_ratio <= 0 or hedge_ratio > 1000:
+        return 1.0
     return hedge_ratio
 
 
-def compute_spread(price_a: pd.Series, price_b: pd.Series, hedge_ratio: float) -> pd.Series:
+def compute_spread(
+    price_a: pd.Series,
+    price_b: pd.Series,
+    hedge_ratio: float,
+    dtype: DTypeLike = np.float32,
+    out: Optional[np.ndarray] = None,
+) -> pd.Series:
     """
     Spread = price_a - hedge_ratio * price_b
+
+    The two legs largely cancel, so the difference is taken in float64
+    and only the (much smaller) result is stored as ``dtype``. Pass a
+    preallocated ``out`` array (same length as the prices) to reuse its
+    memory; its dtype then takes precedence over ``dtype``.
     """
-    spread = price_a - hedge_ratio * price_b
-    return spread
+    if not price_a.index.equals(price_b.index):
+        price_a, price_b = price_a.align(price_b)
+
+    pa = price_a.to_numpy(dtype=np.float64, copy=False)
+    pb = price_b.to_numpy(dtype=np.float64, copy=False)
+    if out is None:
+        out = np.empty(pa.shape[0], dtype=dtype)
 
+    if out.dtype == np.float64:
+        np.multiply(pb, hedge_ratio, out=out)
+        np.subtract(pa, out, out=out)
+    else:
+        # Subtract in float64, cast once on store
+        np.subtract(pa, np.multiply(pb, hedge_ratio), out=out, casting="same_kind")
+    return pd.Series(out, index=price_a.index, copy=False)
 
-def compute_rolling_stats(spread: pd.Series, window: int) -> Tuple[pd.Series, pd.Series]:
+
+def compute_rolling_stats(
+    spread: pd.Series, window: int, dtype: DTypeLike = np.float32
+) -> Tuple[pd.Series, pd.Series]:
     """
-    Rolling mean and std of the spread.
+    Rolling mean and std of the spread, computed in one pass and returned
+    as ``dtype``.
     """
-    roll_mean = spread.rolling(window=window, min_periods=window // 2).mean()
-    roll_std = spread.rolling(window=window, min_periods=window // 2).std()
+    mean, std = rolling_mean_std(
+        spread.to_numpy(dtype=dtype, copy=False), int(window), int(window // 2)
+    )
+    roll_mean = pd.Series(mean, index=spread.index)
+    roll_std = pd.Series(std, index=spread.index)
     return roll_mean, roll_std
 
 
 def compute_zscore(
-    spread: pd.Series, roll_mean: pd.Series, roll_std: pd.Series
+    spread: pd.Series,
+    roll_mean: pd.Series,
+    roll_std: pd.Series,
+    dtype: DTypeLike = np.float32,
 ) -> pd.Series:
     """
-    Rolling z-score of the spread.
+    Rolling z-score of the spread, returned as ``dtype``.
     """
-    z = (spread - roll_mean) / roll_std
-    return z.replace([np.inf, -np.inf], np.nan)
+    if not (spread.index.equals(roll_mean.index) and spread.index.equals(roll_std.index)):
+        spread, roll_mean = spread.align(roll_mean)
+        spread, roll_std = spread.align(roll_std)
+        roll_mean = roll_mean.reindex(spread.index)
+
+    s = spread.to_numpy(dtype=dtype, copy=False)
+    m = roll_mean.to_numpy(dtype=dtype, copy=False)
+    sd = roll_std.to_numpy(dtype=dtype, copy=False)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.subtract(s, m)
+        np.divide(z, sd, out=z)
+    # Map +/-inf (zero std) to NaN in place
+    z[~np.isfinite(z)] = np.nan
+    return pd.Series(z, index=spread.index)
 
 
 
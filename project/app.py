@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -11,10 +11,24 @@ from analytics import (
     compute_zscore,
     estimate_hedge_ratio_ratio,
 )
+from _downsample import lttb
+from _quantile import P2Quantile
 from ingestion import start_background_stream
 from storage import InMemoryStore
 
 
+# Traces longer than CHART_MAX_POINTS are downsampled to CHART_TARGET_POINTS.
+CHART_MAX_POINTS = 4000
+CHART_TARGET_POINTS = 2000
+
+# Sidebar timeframe -> (display name, resample rule)
+_TF: Dict[str, Tuple[str, str]] = {
+    "1s": ("1s", "1S"),
+    "1m": ("1min", "1T"),
+    "5m": ("5min", "5T"),
+}
+
+
 st.set_page_config(
     page_title="Pair Trading Monitor",
     layout="wide",
@@ -30,37 +44,51 @@ def init_state():
 
 def start_stream_if_needed(symbols: List[str]):
     if not st.session_state["stream_started"]:
-        start_background_stream(symbols, st.session_state["store"])
+        store: InMemoryStore = st.session_state["store"]
+        # Register before the first tick so the live hedge-ratio median
+        # covers the whole session (see InMemoryStore.watch_pair).
+        store.watch_pair(symbols[0], symbols[1])
+        start_background_stream(symbols, store)
         st.session_state["stream_started"] = True
 
 
 def get_timeframe_params(timeframe: str) -> Tuple[str, str]:
-    if timeframe == "1s":
-        return "1s", "1S"
-    if timeframe == "1m":
-        return "1min", "1T"
-    if timeframe == "5m":
-        return "5min", "5T"
-    return "1min", "1T"
+    return _TF.get(timeframe, _TF["1m"])
+
+
+def _chart_xy(
+    index: pd.DatetimeIndex, values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Column arrays for a Plotly trace: datetime64 x and raw y values,
+    downsampled with LTTB when the series is long.
+    """
+    x = index.values
+    if len(index) <= CHART_MAX_POINTS:
+        return x, values
+    idx = lttb(index.asi8, values, CHART_TARGET_POINTS)
+    return x[idx], values[idx]
 
 
 def build_price_chart(df_a: pd.DataFrame, df_b: pd.DataFrame, sym_a: str, sym_b: str):
     fig = go.Figure()
     if not df_a.empty:
+        x_a, y_a = _chart_xy(df_a.index, df_a["close"].to_numpy(copy=False))
         fig.add_trace(
-            go.Scatter(
-                x=df_a.index,
-                y=df_a["close"],
+            go.Scattergl(
+                x=x_a,
+                y=y_a,
                 mode="lines",
                 name=f"{sym_a}",
                 line=dict(color="#1f77b4", width=2),
             )
         )
     if not df_b.empty:
+        x_b, y_b = _chart_xy(df_b.index, df_b["close"].to_numpy(copy=False))
         fig.add_trace(
-            go.Scatter(
-                x=df_b.index,
-                y=df_b["close"],
+            go.Scattergl(
+                x=x_b,
+                y=y_b,
                 mode="lines",
                 name=f"{sym_b}",
                 yaxis="y2",
@@ -87,10 +115,11 @@ def build_price_chart(df_a: pd.DataFrame, df_b: pd.DataFrame, sym_a: str, sym_b:
 def build_spread_chart(spread: pd.Series):
     fig = go.Figure()
     if not spread.empty:
+        x, y = _chart_xy(spread.index, spread.to_numpy(copy=False))
         fig.add_trace(
-            go.Scatter(
-                x=spread.index,
-                y=spread.values,
+            go.Scattergl(
+                x=x,
+                y=y,
                 mode="lines",
                 name="Spread",
                 line=dict(color="#2ca02c", width=2),
@@ -111,10 +140,11 @@ def build_spread_chart(spread: pd.Series):
 def build_zscore_chart(zscore: pd.Series, entry_threshold: float):
     fig = go.Figure()
     if not zscore.empty:
+        x, y = _chart_xy(zscore.index, zscore.to_numpy(copy=False))
         fig.add_trace(
-            go.Scatter(
-                x=zscore.index,
-                y=zscore.values,
+            go.Scattergl(
+                x=x,
+                y=y,
                 mode="lines",
                 name="Z-Score",
                 line=dict(color="#9467bd", width=2),
@@ -163,6 +193,54 @@ def build_zscore_chart(zscore: pd.Series, entry_threshold: float):
     return fig
 
 
+def compute_analytics(
+    key: Tuple[str, str, str],
+    pa: pd.Series,
+    pb: pd.Series,
+    window: int,
+    live: Optional[P2Quantile] = None,
+) -> Tuple[float, pd.Series, pd.Series, pd.Series, pd.Series]:
+    """
+    Hedge ratio, spread, rolling stats and z-score for the aligned prices.
+
+    Results for the completed bars (all but the last, still-open one) are
+    kept in this session's state, keyed on ``key`` (symbols and rule), the
+    window and the completed-bar span, so they are only recomputed when a
+    bar closes. The open bar is appended on every rerun with O(window)
+    work, using the hedge ratio estimated from the completed bars.
+    """
+    full_key = (
+        key,
+        window,
+        len(pa) - 1,
+        int(pa.index[0].value),
+        int(pa.index[-2].value),
+    )
+    cached = st.session_state.get("analytics_cache")
+    if cached is None or cached[0] != full_key:
+        pa_done, pb_done = pa.iloc[:-1], pb.iloc[:-1]
+        hedge_ratio = estimate_hedge_ratio_ratio(pa_done, pb_done, live)
+        spread = compute_spread(pa_done, pb_done, hedge_ratio)
+        roll_mean, roll_std = compute_rolling_stats(spread, window)
+        zscore = compute_zscore(spread, roll_mean, roll_std)
+        cached = (full_key, hedge_ratio, spread, roll_mean, roll_std, zscore)
+        st.session_state["analytics_cache"] = cached
+    _, hedge_ratio, spread, roll_mean, roll_std, zscore = cached
+
+    # Open bar: its rolling stats only depend on the trailing window
+    spread_open = compute_spread(pa.iloc[-1:], pb.iloc[-1:], hedge_ratio)
+    tail = pd.concat([spread.iloc[-(window - 1) :], spread_open])
+    tail_mean, tail_std = compute_rolling_stats(tail, window)
+    mean_open, std_open = tail_mean.iloc[-1:], tail_std.iloc[-1:]
+    z_open = compute_zscore(spread_open, mean_open, std_open)
+
+    return (
+        hedge_ratio,
+        pd.concat([spread, spread_open]),
+        pd.concat([roll_mean, mean_open]),
+        pd.concat([roll_std, std_open]),
+        pd.concat([zscore, z_open]),
+    )
 
 
 def main():
@@ -206,19 +284,29 @@ def main():
         st.info("⏳ Waiting for live data from Binance... Please wait a few moments.")
         st.stop()
 
-    common_index = df_a.index.intersection(df_b.index)
-    pa = df_a.reindex(common_index)["close"]
-    pb = df_b.reindex(common_index)["close"]
+    # Both frames come from the same resample rule, so their indexes are
+    # sorted and unique: intersect the raw int64 timestamps directly.
+    ai = df_a.index.asi8
+    bi = df_b.index.asi8
+    common = np.intersect1d(ai, bi, assume_unique=True)
+    ia = np.searchsorted(ai, common)
+    ib = np.searchsorted(bi, common)
+    common_index = df_a.index[ia]
+    pa = pd.Series(df_a["close"].to_numpy()[ia], index=common_index, name="close")
+    pb = pd.Series(df_b["close"].to_numpy()[ib], index=common_index, name="close")
 
     if len(pa) < max(window, 30):
         st.info(f"📊 Collecting data... Need at least {max(window, 30)} bars. Currently have {len(pa)}.")
         st.stop()
 
     # Compute analytics with ratio-based hedge ratio
-    hedge_ratio = estimate_hedge_ratio_ratio(pa, pb)
-    spread = compute_spread(pa, pb, hedge_ratio)
-    roll_mean, roll_std = compute_rolling_stats(spread, int(window))
-    zscore = compute_zscore(spread, roll_mean, roll_std)
+    hedge_ratio, spread, roll_mean, roll_std, zscore = compute_analytics(
+        (sym_a, sym_b, tf_rule),
+        pa,
+        pb,
+        int(window),
+        store.watch_pair(sym_a.lower(), sym_b.lower()),
+    )
 
     current_z = float(zscore.iloc[-1]) if not np.isnan(zscore.iloc[-1]) else np.nan
     current_spread = float(spread.iloc[-1]) if not np.isnan(spread.iloc[-1]) else np.nan
@@ -1,18 +1,9 @@
-from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Tuple
 
 import numpy as np
 import pandas as pd
 
-
-@dataclass
-class Trade:
-    entry_time: pd.Timestamp
-    exit_time: pd.Timestamp
-    direction: int  # +1: long A / short B, -1: short A / long B
-    entry_z: float
-    exit_z: float
-    pnl: float
+from _kernels import bt_kernel
 
 
 def backtest_mean_reversion(
@@ -54,73 +45,45 @@ def backtest_mean_reversion(
             dtype=float
         )
 
-    in_position = False
-    direction = 0
-    entry_idx = None
-    entry_z_val = 0.0
-    trades: List[Trade] = []
-
-    pnl_series = pd.Series(0.0, index=s.index)
-
-    prev_spread = None
-    for t, (sp, zval) in enumerate(zip(s.values, z.values)):
-        ts = s.index[t]
-        if prev_spread is None:
-            prev_spread = sp
-            continue
-
-        if not in_position:
-            if zval >= entry_z:
-                in_position = True
-                direction = -1  # short spread: short A / long B
-                entry_idx = ts
-                entry_z_val = zval
-            elif zval <= -entry_z:
-                in_position = True
-                direction = 1  # long spread: long A / short B
-                entry_idx = ts
-                entry_z_val = zval
-        else:
-            # Check exit condition: crossing the exit_z level
-            if (direction == 1 and zval >= exit_z) or (direction == -1 and zval <= exit_z):
-                # Close trade
-                exit_idx = ts
-                exit_z_val = zval
-                pnl = direction * (sp - prev_spread)
-                trades.append(
-                    Trade(
-                        entry_time=entry_idx,
-                        exit_time=exit_idx,
-                        direction=direction,
-                        entry_z=entry_z_val,
-                        exit_z=exit_z_val,
-                        pnl=pnl,
-                    )
-                )
-                in_position = False
-                direction = 0
-                entry_idx = None
-
-        # Mark PnL incrementally (very simplified)
-        if in_position:
-            pnl_series.iloc[t] = direction * (sp - prev_spread)
-
-        prev_spread = sp
+    # float32 inputs (see analytics) are passed through without upcasting.
+    dtype = np.float32 if s.dtype == np.float32 else np.float64
+    sp = s.to_numpy(dtype=dtype, copy=False)
+    n = sp.shape[0]
+
+    # SoA trade buffers; a trade needs at least two bars, so n is an upper bound.
+    pnl = np.zeros(n, dtype=np.float64)
+    entry_idx = np.empty(n, dtype=np.int64)
+    exit_idx = np.empty(n, dtype=np.int64)
+    direction = np.empty(n, dtype=np.int8)  # +1: long A / short B, -1: short A / long B
+    entry_zs = np.empty(n, dtype=np.float64)
+    exit_zs = np.empty(n, dtype=np.float64)
+    pnl_trade = np.empty(n, dtype=np.float64)
+
+    k = bt_kernel(
+        sp,
+        z.to_numpy(dtype=dtype, copy=False),
+        float(entry_z),
+        float(exit_z),
+        pnl,
+        entry_idx,
+        exit_idx,
+        direction,
+        entry_zs,
+        exit_zs,
+        pnl_trade,
+    )
 
-    equity_curve = pnl_series.cumsum()
+    equity_curve = pd.Series(pnl.cumsum(), index=s.index)
 
     trades_df = pd.DataFrame(
-        [
-            {
-                "entry_time": tr.entry_time,
-                "exit_time": tr.exit_time,
-                "direction": tr.direction,
-                "entry_z": tr.entry_z,
-                "exit_z": tr.exit_z,
-                "pnl": tr.pnl,
-            }
-            for tr in trades
-        ]
+        {
+            "entry_time": s.index[entry_idx[:k]],
+            "exit_time": s.index[exit_idx[:k]],
+            "direction": direction[:k],
+            "entry_z": entry_zs[:k],
+            "exit_z": exit_zs[:k],
+            "pnl": pnl_trade[:k],
+        }
     )
 
     return trades_df, equity_curve
@@ -1,8 +1,9 @@
 import asyncio
-import json
 import threading
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
+import orjson
 import websockets
 
 from storage import InMemoryStore
@@ -10,6 +11,92 @@ from storage import InMemoryStore
 
 BINANCE_WS_URL = "wss://stream.binance.com:9443/stream"
 
+# Messages are coalesced and written to the store in batches.
+MAX_BATCH = 500
+FLUSH_INTERVAL_S = 0.05
+
+
+async def _recv_batch(ws) -> List[str]:
+    """
+    Wait for one message, then keep draining until MAX_BATCH messages
+    are buffered or FLUSH_INTERVAL_S has elapsed.
+    """
+    msgs = [await ws.recv()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + FLUSH_INTERVAL_S
+    while len(msgs) < MAX_BATCH:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            msgs.append(await asyncio.wait_for(ws.recv(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return msgs
+
+
+def _store_batch(msgs: List[str], store: InMemoryStore) -> None:
+    """
+    Decode a batch of trade frames and append them to the store, one
+    vectorized write per symbol.
+    """
+    ts_l: List[int] = []
+    sym_l: List[str] = []
+    p_l: List[str] = []
+    q_l: List[str] = []
+    for msg in msgs:
+        # Trade payload fields:
+        #  E: eventTime (ms)
+        #  s: symbol
+        #  p: price (decimal string)
+        #  q: quantity (decimal string)
+        try:
+            payload = orjson.loads(msg)["data"]
+            ts, sym, price, qty = payload["E"], payload["s"], payload["p"], payload["q"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        ts_l.append(ts)
+        sym_l.append(sym)
+        p_l.append(price)
+        q_l.append(qty)
+
+    if not ts_l:
+        return
+
+    # Cast whole columns at once; price/qty strings are parsed by NumPy.
+    try:
+        ts_a = np.fromiter(ts_l, dtype=np.int64, count=len(ts_l))
+        price_a = np.asarray(p_l, dtype=np.float64)
+        qty_a = np.asarray(q_l, dtype=np.float64)
+    except (TypeError, ValueError):
+        ts_a, sym_l, price_a, qty_a = _cast_rows(ts_l, sym_l, p_l, q_l)
+    sym_a = np.asarray(sym_l)
+
+    for sym in set(sym_l):
+        if not isinstance(sym, str):
+            continue
+        sel = sym_a == sym
+        store.append_trades_batch(sym.lower(), ts_a[sel], price_a[sel], qty_a[sel])
+
+
+def _cast_rows(
+    ts_l: List[int], sym_l: List[str], p_l: List[str], q_l: List[str]
+) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+    """
+    Row-by-row fallback for a batch whose column cast failed: drop only
+    the rows whose fields don't parse.
+    """
+    rows = []
+    for ts, sym, price, qty in zip(ts_l, sym_l, p_l, q_l):
+        try:
+            rows.append((int(ts), sym, float(price), float(qty)))
+        except (TypeError, ValueError):
+            continue
+    ts_a = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    price_a = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+    qty_a = np.fromiter((r[3] for r in rows), dtype=np.float64, count=len(rows))
+    return ts_a, [r[1] for r in rows], price_a, qty_a
+
 
 async def _trade_stream(symbols: List[str], store: InMemoryStore):
     """
@@ -30,32 +117,28 @@ async def _trade_stream(symbols: List[str], store: InMemoryStore):
                 url, ping_interval=20, ping_timeout=20
             ) as ws:
                 print("[ingestion] WebSocket connected.")
-                async for msg in ws:
-                    data = json.loads(msg)
-                    payload = data.get("data", {})
-
-                    # Trade payload fields:
-                    #  E: eventTime (ms)
-                    #  s: symbol
-                    #  p: price
-                    #  q: quantity
-                    ts = payload.get("E")
-                    sym = payload.get("s", "").lower()
-                    price = float(payload.get("p", 0.0))
-                    qty = float(payload.get("q", 0.0))
-
-                    if ts is None or not sym:
-                        continue
-
-                    store.append_trade(sym, ts, price, qty)
+                while True:
+                    msgs = await _recv_batch(ws)
+
+                    _store_batch(msgs, store)
         except Exception as exc:
             print(f"[ingestion] WebSocket error: {exc!r}. Reconnecting in 1s...")
             await asyncio.sleep(1.0)
             continue
 
 
+def _new_event_loop() -> asyncio.AbstractEventLoop:
+    # Prefer uvloop when available (not on Windows). Only this thread's
+    # loop is replaced; the global policy used by Streamlit is untouched.
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.new_event_loop()
+    return uvloop.new_event_loop()
+
+
 def _run_loop(symbols: List[str], store: InMemoryStore):
-    loop = asyncio.new_event_loop()
+    loop = _new_event_loop()
     asyncio.set_event_loop(loop)
     try:
         loop.run_until_complete(_trade_stream(symbols, store))
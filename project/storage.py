@@ -1,14 +1,28 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
-from typing import Dict
+from typing import Dict, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
 
+from _kernels import head_bar, ohlcv
+from _quantile import P2Quantile
 
-def _ts_ms_to_datetime(ts_ms: int) -> datetime:
-    return datetime.fromtimestamp(ts_ms / 1000.0, tz=timezone.utc)
+
+# Fixed-width resample rules handled by the OHLCV kernel (bucket size in ms).
+# Other rules fall back to pandas resample.
+_RULE_BUCKET_MS: Dict[str, int] = {
+    "1S": 1_000,
+    "1s": 1_000,
+    "1T": 60_000,
+    "1min": 60_000,
+    "5T": 300_000,
+    "5min": 300_000,
+}
+
+_BAR_COLUMNS = ["open", "high", "low", "close", "volume"]
 
 
 @dataclass
@@ -16,40 +30,207 @@ class InMemoryStore:
     """
     Simple in-memory store for tick data and resampled bars.
 
+    Ticks are kept per symbol in preallocated NumPy ring buffers
+    (timestamp in ms, price, qty) so appends are O(1); DataFrames are
+    only materialized on read.
+
     This is intentionally designed to be swappable with a more scalable
     backend (e.g., Redis, TimescaleDB) by keeping the interface minimal.
     """
 
     max_rows: int = 100_000
-    _ticks: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    # symbol -> (ts_ms, price, qty, cursor, count)
+    _buf: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]] = field(
+        default_factory=dict
+    )
+    # Running median of price_a / price_b for watched (sym_a, sym_b) pairs
+    _pairs: Dict[Tuple[str, str], P2Quantile] = field(default_factory=dict)
+    # Pairs whose estimator no longer covers the buffered ticks
+    _retired: Set[Tuple[str, str]] = field(default_factory=set)
+    _last_price: Dict[str, float] = field(default_factory=dict)
+    # (symbol, rule) -> (tick cursor, bars)
+    _resample_cache: Dict[Tuple[str, str], Tuple[int, pd.DataFrame]] = field(
+        default_factory=dict
+    )
+    # Guards the ring buffers: held while writing and while copying reads,
+    # so a reader never sees a tick whose columns come from different writes.
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _new_buffer(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]:
+        return (
+            np.empty(self.max_rows, dtype=np.int64),
+            np.empty(self.max_rows, dtype=np.float64),
+            np.empty(self.max_rows, dtype=np.float64),
+            0,
+            0,
+        )
 
     def append_trade(self, symbol: str, ts_ms: int, price: float, qty: float) -> None:
-        dt = _ts_ms_to_datetime(ts_ms)
+        with self._lock:
+            buf = self._buf.get(symbol)
+            if buf is None:
+                buf = self._new_buffer()
 
-        if symbol not in self._ticks:
-            self._ticks[symbol] = pd.DataFrame(
-                {"price": [price], "qty": [qty]}, index=pd.DatetimeIndex([dt])
-            )
+            ts, p, q, cursor, count = buf
+            i = cursor % self.max_rows
+            ts[i] = ts_ms
+            p[i] = price
+            q[i] = qty
+
+            self._buf[symbol] = (ts, p, q, cursor + 1, min(count + 1, self.max_rows))
+
+            if self._pairs:
+                self._update_pairs(symbol, (price,))
+
+    def append_trades_batch(
+        self, symbol: str, ts_ms: np.ndarray, price: np.ndarray, qty: np.ndarray
+    ) -> None:
+        """
+        Append a batch of ticks for one symbol with slice writes.
+
+        Arrays must be equal length and in arrival order.
+        """
+        k = len(ts_ms)
+        if k == 0:
             return
 
-        df = self._ticks[symbol]
-        new_row = pd.DataFrame(
-            {"price": [price], "qty": [qty]}, index=pd.DatetimeIndex([dt])
-        )
-        df = pd.concat([df, new_row])
+        with self._lock:
+            buf = self._buf.get(symbol)
+            if buf is None:
+                buf = self._new_buffer()
+
+            ts, p, q, cursor, count = buf
+            n = self.max_rows
+
+            # Only the newest max_rows ticks can survive the write.
+            skip = max(k - n, 0)
+            src_ts, src_p, src_q = ts_ms[skip:], price[skip:], qty[skip:]
+            m = k - skip
 
-        if len(df) > self.max_rows:
-            df = df.iloc[-self.max_rows :]
+            i = (cursor + skip) % n
+            head = min(m, n - i)
+            ts[i : i + head] = src_ts[:head]
+            p[i : i + head] = src_p[:head]
+            q[i : i + head] = src_q[:head]
 
-        self._ticks[symbol] = df
+            tail = m - head
+            if tail:
+                ts[:tail] = src_ts[head:]
+                p[:tail] = src_p[head:]
+                q[:tail] = src_q[head:]
+
+            self._buf[symbol] = (ts, p, q, cursor + k, min(count + k, n))
+
+            if self._pairs:
+                self._update_pairs(symbol, price.tolist())
+
+    def watch_pair(self, sym_a: str, sym_b: str) -> P2Quantile:
+        """
+        Track a running median of the sym_a / sym_b price ratio, updated
+        on every tick of either symbol with the other symbol's last price.
+        Returns the live estimator.
+
+        This is a tick-weighted median, not the median over aligned bar
+        closes used as the fallback: busy periods count for more, and a
+        batch of one symbol's ticks is paired with the other symbol's price
+        from before that batch. Register pairs before the stream starts.
+
+        The estimator is only kept while it covers the same ticks as the
+        ring buffers: if either symbol already has buffered ticks when the
+        pair is registered, or once either ring starts evicting, it is
+        reset and never warms up again, so callers fall back to an exact
+        median over the buffered data.
+        """
+        pair = (sym_a, sym_b)
+        with self._lock:
+            est = self._pairs.get(pair)
+            if est is None:
+                est = self._pairs[pair] = P2Quantile(0.5)
+                if sym_a in self._buf or sym_b in self._buf:
+                    self._retired.add(pair)
+            return est
+
+    def _update_pairs(self, symbol: str, prices) -> None:
+        # Caller holds the lock.
+        last = self._last_price
+        for pair, est in self._pairs.items():
+            if pair in self._retired:
+                continue
+            sym_a, sym_b = pair
+            if symbol != sym_a and symbol != sym_b:
+                continue
+            if any(s in self._buf and self._buf[s][3] > self.max_rows for s in pair):
+                # Oldest ticks are being dropped; a running median can't forget them.
+                est.reset()
+                self._retired.add(pair)
+                continue
+            if symbol == sym_a:
+                pb = last.get(sym_b)
+                if pb:
+                    for pa in prices:
+                        est.update(pa / pb)
+            else:
+                pa = last.get(sym_a)
+                if pa is not None:
+                    for pb in prices:
+                        if pb:
+                            est.update(pa / pb)
+        if prices:
+            last[symbol] = prices[-1]
+
+    def _read(
+        self, buf: Tuple[np.ndarray, np.ndarray, np.ndarray, int, int], last: int = -1
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Copy (ts_ms, price, qty) for the buffered ticks in arrival order,
+        or only the newest ``last`` ticks if given. Caller holds the lock.
+        """
+        ts, p, q, cursor, count = buf
+        k = count if last < 0 else min(last, count)
+        start = (cursor - k) % self.max_rows
+        if start + k <= self.max_rows:
+            return (
+                ts[start : start + k].copy(),
+                p[start : start + k].copy(),
+                q[start : start + k].copy(),
+            )
+
+        # Range wraps around the end of the buffer.
+        end = cursor % self.max_rows
+        return (
+            np.concatenate((ts[start:], ts[:end])),
+            np.concatenate((p[start:], p[:end])),
+            np.concatenate((q[start:], q[:end])),
+        )
+
+    def _snapshot(self, symbol: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """
+        Consistent copy of a symbol's ticks plus the write cursor it
+        corresponds to.
+        """
+        with self._lock:
+            buf = self._buf[symbol]
+            ts, p, q = self._read(buf)
+            return ts, p, q, buf[3]
 
     def get_ticks(self, symbol: str) -> pd.DataFrame:
-        return self._ticks.get(symbol, pd.DataFrame(columns=["price", "qty"]))
+        if symbol not in self._buf:
+            return pd.DataFrame(columns=["price", "qty"])
+
+        ts, p, q, _ = self._snapshot(symbol)
+        return pd.DataFrame(
+            {"price": p, "qty": q},
+            index=pd.to_datetime(ts, unit="ms", utc=True),
+        )
 
     def get_resampled(self, symbol: str, rule: str) -> pd.DataFrame:
         """
         Return OHLCV bars resampled from ticks using the given rule.
 
+        Results are cached per (symbol, rule) against the tick write
+        counter. For the fixed-width rules, new ticks are folded into the
+        cached bars instead of re-resampling the whole buffer.
+
         Parameters
         ----------
         symbol : str
@@ -57,13 +238,156 @@ class InMemoryStore:
         rule : str
             Pandas resample rule (e.g., '1S', '1T', '5T').
         """
-        df = self.get_ticks(symbol)
-        if df.empty:
-            return pd.DataFrame(columns=["open", "high", "low", "close", "volume"])
+        if symbol not in self._buf:
+            return pd.DataFrame(columns=_BAR_COLUMNS)
+
+        key = (symbol, rule)
+        cached = self._resample_cache.get(key)
+        bucket_ms = _RULE_BUCKET_MS.get(rule)
+
+        bars = None
+        if bucket_ms is not None and cached is not None:
+            # The cursor and the ticks read after it come from one lock
+            # hold, so the cached cursor always matches the bars.
+            with self._lock:
+                buf = self._buf[symbol]
+                cursor = buf[3]
+                if cursor == cached[0]:
+                    return cached[1]
+                changes = self._read_changes(buf, bucket_ms, cached[0])
+            if changes is not None:
+                bars = _extend_bars(cached[1], bucket_ms, *changes)
+
+        if bars is None:
+            ts, p, q, cursor = self._snapshot(symbol)
+            if cached is not None and cursor == cached[0]:
+                return cached[1]
+            if bucket_ms is None:
+                bars = _resample_pandas(ts, p, q, rule)
+            else:
+                bars = _bars_frame(*ohlcv(ts, p, q, bucket_ms))
 
-        ohlc = df["price"].resample(rule).ohlc()
-        vol = df["qty"].resample(rule).sum().rename("volume")
-        bars = pd.concat([ohlc, vol], axis=1).dropna(how="all")
+        self._resample_cache[key] = (cursor, bars)
         return bars
 
+    def _read_changes(
+        self,
+        buf: Tuple[np.ndarray, np.ndarray, np.ndarray, int, int],
+        bucket_ms: int,
+        cached_cursor: int,
+    ):
+        """
+        Collect what changed since bars were cached at ``cached_cursor``:
+        the recomputed first bar if the ring has evicted ticks (else None)
+        and copies of the ticks written since. Returns None when nothing
+        cached survives or there is nothing new. Caller holds the lock.
+        """
+        ts, p, q, cursor, count = buf
+        oldest = cursor - count
+        if cursor <= cached_cursor or oldest >= cached_cursor:
+            return None
+
+        head = None
+        if oldest > 0:
+            head = head_bar(ts, p, q, oldest % self.max_rows, count, bucket_ms)
+        return (head,) + self._read(buf, cursor - cached_cursor)
+
+
+def _bucket(stamp: pd.Timestamp, bucket_ms: int) -> int:
+    return int(stamp.value // 1_000_000) // bucket_ms
+
+
+def _extend_bars(
+    cached: pd.DataFrame,
+    bucket_ms: int,
+    head: Optional[Tuple[int, np.ndarray]],
+    ts: np.ndarray,
+    p: np.ndarray,
+    q: np.ndarray,
+) -> Optional[pd.DataFrame]:
+    """
+    Update ``cached`` bars: drop bars whose ticks were all evicted, replace
+    the (possibly partially evicted) first bar with ``head``, and fold the
+    new ticks into the tail.
+
+    Cached bars cover every bucket between the first and last one, so a
+    bucket maps to a row by offset. Returns None when a full recompute is
+    needed: the head bucket falls outside the cached range or a new tick
+    lands before the last cached bar.
+    """
+    if cached.empty:
+        return None
+
+    first_bucket = _bucket(cached.index[0], bucket_ms)
+    last_bucket = _bucket(cached.index[-1], bucket_ms)
+
+    parts = []
+    body = cached
+    if head is not None:
+        b0, first_bar = head
+        if b0 < first_bucket or b0 >= last_bucket:
+            return None
+        parts.append(_bars_frame(np.array([b0 * bucket_ms]), first_bar.reshape(5, 1)))
+        body = cached.iloc[b0 - first_bucket + 1 :]
+
+    bkt, bars = ohlcv(ts, p, q, bucket_ms)
+    first_new = int(bkt[0]) // bucket_ms
+    if first_new < last_bucket:
+        return None
+
+    if first_new == last_bucket:
+        # Merge into the still-open last bar
+        o, h, lo, _, v = cached.iloc[-1].to_numpy()
+        bars[0, 0] = o
+        bars[1, 0] = max(h, bars[1, 0])
+        bars[2, 0] = min(lo, bars[2, 0])
+        bars[4, 0] += v
+        body = body.iloc[:-1]
+    elif first_new > last_bucket + 1:
+        # Empty buckets between the cached tail and the new ticks
+        gap = first_new - last_bucket - 1
+        pad = np.full((5, gap), np.nan)
+        pad[4] = 0.0
+        bars = np.concatenate((pad, bars), axis=1)
+        bkt = np.concatenate(
+            ((last_bucket + 1 + np.arange(gap, dtype=np.int64)) * bucket_ms, bkt)
+        )
+
+    parts += [body, _bars_frame(bkt, bars)]
+    return pd.concat(parts)
+
+
+def _resample_pandas(
+    ts: np.ndarray, p: np.ndarray, q: np.ndarray, rule: str
+) -> pd.DataFrame:
+    df = pd.DataFrame(
+        {"price": p, "qty": q},
+        index=pd.to_datetime(ts, unit="ms", utc=True),
+    )
+
+    ohlc = df["price"].resample(rule).ohlc()
+    vol = df["qty"].resample(rule).sum()
+    # Stack same-dtype columns into one block instead of concatenating frames
+    values = np.vstack(
+        (
+            ohlc["open"].to_numpy(dtype=np.float64),
+            ohlc["high"].to_numpy(dtype=np.float64),
+            ohlc["low"].to_numpy(dtype=np.float64),
+            ohlc["close"].to_numpy(dtype=np.float64),
+            vol.to_numpy(dtype=np.float64),
+        )
+    )
+    bars = pd.DataFrame(
+        values.T, index=ohlc.index, columns=_BAR_COLUMNS, copy=False
+    ).dropna(how="all")
+    return bars
+
 
+def _bars_frame(bkt: np.ndarray, bars: np.ndarray) -> pd.DataFrame:
+    # bars is (5, n) from the ohlcv kernel; its transpose backs one block.
+    return pd.DataFrame(
+        bars.T,
+        index=pd.to_datetime(bkt, unit="ms", utc=True),
+        columns=_BAR_COLUMNS,
+        copy=False,
+    )